@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Ahead-of-time compilation of common mathematical routines.
+
+The array kernels of :mod:`ahrs.common.mathfuncs` are compiled into the
+extension module ``_mathfuncs_aot``, which is saved next to this file. If the
+extension is found, :mod:`ahrs.common.mathfuncs` uses it instead of compiling
+the same kernels just-in-time at their first call. The compiled loops are
+serial, so the large arrays of :func:`cosd` and :func:`sind` keep using the
+parallel kernels compiled just-in-time.
+
+Build it with::
+
+    python -m ahrs.common._aot_mathfuncs
+
+"""
+
+import math
+import os
+import numpy as np
+from numba.pycc import CC
+
+cc = CC('_mathfuncs_aot')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+_DEG2RAD = math.pi/180.0
+
+
+@cc.export('cosd_arr', 'f8[:](f8[:])')
+def cosd_arr(x):
+    y = np.empty(x.size)
+    for i in range(x.size):
+        y[i] = math.cos(x[i]*_DEG2RAD)
+    return y
+
+
+@cc.export('sind_arr', 'f8[:](f8[:])')
+def sind_arr(x):
+    y = np.empty(x.size)
+    for i in range(x.size):
+        y[i] = math.sin(x[i]*_DEG2RAD)
+    return y
+
+
+@cc.export('skew_arr', 'f8[:,:](f8[:])')
+def skew_arr(x):
+    X = np.zeros((3, 3))
+    X[0, 1] = -x[2]
+    X[0, 2] = x[1]
+    X[1, 0] = x[2]
+    X[1, 2] = -x[0]
+    X[2, 0] = -x[1]
+    X[2, 1] = x[0]
+    return X
+
+
+if __name__ == '__main__':
+    cc.compile()
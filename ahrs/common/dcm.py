@@ -612,7 +612,7 @@ class DCM(np.ndarray):
         """
         axis /= np.linalg.norm(axis)
         K = skew(axis)
-        return np.identity(3) + np.sin(angle)*K + (1-np.cos(angle))*K@K
+        return np.identity(3) + np.sin(angle)*K + (1-np.cos(angle))*skew_sq(axis)
 
     def from_axang(self, axis: np.ndarray, angle: float) -> np.ndarray:
         """
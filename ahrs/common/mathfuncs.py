@@ -4,27 +4,83 @@ Common mathematical routines.
 
 """
 
+import math
 import numpy as np
 from .constants import *
-from numba import njit
+from numba import njit, prange, types
+from numba.extending import overload
+
+# The compiled kernels only accept floats or NumPy arrays. Lists are converted
+# by the public functions, which are also overloaded for compiled callers.
+
+# Local float copy of DEG2RAD, frozen by Numba as a compile-time constant
+_DEG2RAD = math.pi/180.0
+
+
+@njit(parallel=True, cache=True, fastmath=True, boundscheck=False)
+def _cosd_array(x):
+    y = np.empty(x.size)
+    x_flat = x.ravel()
+    for i in prange(x.size):
+        y[i] = math.cos(x_flat[i]*_DEG2RAD)
+    return y.reshape(x.shape)
+
+
+@njit(parallel=True, cache=True, fastmath=True, boundscheck=False)
+def _sind_array(x):
+    y = np.empty(x.size)
+    x_flat = x.ravel()
+    for i in prange(x.size):
+        y[i] = math.sin(x_flat[i]*_DEG2RAD)
+    return y.reshape(x.shape)
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _sincosd_scalar(x):
+    r = x*_DEG2RAD
+    return math.sin(r), math.cos(r)
+
+
+@njit(parallel=True, cache=True, fastmath=True, boundscheck=False)
+def _sincosd_array(x):
+    s = np.empty(x.size)
+    c = np.empty(x.size)
+    x_flat = x.ravel()
+    for i in prange(x.size):
+        r = x_flat[i]*_DEG2RAD
+        s[i] = math.sin(r)
+        c[i] = math.cos(r)
+    return s.reshape(x.shape), c.reshape(x.shape)
+
+
+try:
+    # Kernels compiled ahead-of-time with ``python -m ahrs.common._aot_mathfuncs``
+    from ._mathfuncs_aot import cosd_arr as _cosd_aot, sind_arr as _sind_aot, skew_arr as _skew_aot
+except ImportError:
+    _cosd_aot = _sind_aot = _skew_aot = None
+
+# The ahead-of-time kernels are serial, so only arrays up to this size, too
+# small to amortize the start of the threads of the parallel kernels, use them
+_AOT_MAX_SIZE = 1000
 
 
-@njit
 def cosd(x):
     """
     Return the cosine of `x`, which is expressed in degrees.
 
-    If `x` is a list, it will be converted first to a NumPy array, and then the
-    cosine operation over each value will be carried out.
+    Scalars are evaluated with :func:`math.cos`. Lists and arrays are
+    converted to a NumPy array, and the cosine operation over each value is
+    carried out in a compiled loop, which runs in parallel for large arrays.
+    The function can also be called from Numba-compiled code.
 
     Parameters
     ----------
-    x : float
+    x : float or array-like
         Angle in Degrees
 
     Returns
     -------
-    y : float
+    y : float or numpy.ndarray
         Cosine of given angle
 
     Examples
@@ -38,27 +94,39 @@ def cosd(x):
     -0.5
 
     """
-    if isinstance(x, list):
-        x = np.asarray(x)
-    return np.cos(x*DEG2RAD)
+    if np.ndim(x) == 0:
+        return math.cos(x*_DEG2RAD)
+    x = np.asarray(x, dtype=float)
+    if _cosd_aot is not None and x.size <= _AOT_MAX_SIZE:
+        return _cosd_aot(x.ravel()).reshape(x.shape)
+    return _cosd_array(x)
+
+
+@overload(cosd)
+def _cosd_jit(x):
+    if isinstance(x, (types.Float, types.Integer)):
+        return lambda x: math.cos(x*_DEG2RAD)
+    if isinstance(x, types.Array):
+        return lambda x: _cosd_array(x)
 
 
-@njit
 def sind(x):
     """
     Return the sine of `x`, which is expressed in degrees.
 
-    If `x` is a list, it will be converted first to a NumPy array, and then the
-    sine operation over each value will be carried out.
+    Scalars are evaluated with :func:`math.sin`. Lists and arrays are
+    converted to a NumPy array, and the sine operation over each value is
+    carried out in a compiled loop, which runs in parallel for large arrays.
+    The function can also be called from Numba-compiled code.
 
     Parameters
     ----------
-    x : float
+    x : float or array-like
         Angle in Degrees
 
     Returns
     -------
-    y : float
+    y : float or numpy.ndarray
         Sine of given angle
 
     Examples
@@ -72,13 +140,82 @@ def sind(x):
     -0.86602540378
 
     """
-    if isinstance(x, list):
-        x = np.asarray(x)
-    return np.sin(x*DEG2RAD)
+    if np.ndim(x) == 0:
+        return math.sin(x*_DEG2RAD)
+    x = np.asarray(x, dtype=float)
+    if _sind_aot is not None and x.size <= _AOT_MAX_SIZE:
+        return _sind_aot(x.ravel()).reshape(x.shape)
+    return _sind_array(x)
+
 
+@overload(sind)
+def _sind_jit(x):
+    if isinstance(x, (types.Float, types.Integer)):
+        return lambda x: math.sin(x*_DEG2RAD)
+    if isinstance(x, types.Array):
+        return lambda x: _sind_array(x)
 
-@njit
-def skew(x):
+
+def sincosd(x):
+    """
+    Return the sine and cosine of `x`, which is expressed in degrees.
+
+    Both values are computed from the same converted angle, which is cheaper
+    than calling :func:`sind` and :func:`cosd` separately. Lists and arrays
+    are converted to a NumPy array first. The function can also be called
+    from Numba-compiled code.
+
+    Parameters
+    ----------
+    x : float or array-like
+        Angle in Degrees
+
+    Returns
+    -------
+    s : float or numpy.ndarray
+        Sine of given angle
+    c : float or numpy.ndarray
+        Cosine of given angle
+
+    Examples
+    --------
+    >>> from ahrs.common.mathfuncs import sincosd
+    >>> sincosd(30.0)
+    (0.49999999999999994, 0.8660254037844387)
+    >>> sincosd([0.0, 90.0])
+    (array([0., 1.]), array([1.000000e+00, 6.123234e-17]))
+
+    """
+    if np.ndim(x) == 0:
+        r = x*_DEG2RAD
+        return math.sin(r), math.cos(r)
+    return _sincosd_array(np.asarray(x, dtype=float))
+
+
+@overload(sincosd)
+def _sincosd_jit(x):
+    if isinstance(x, (types.Float, types.Integer)):
+        return lambda x: _sincosd_scalar(x)
+    if isinstance(x, types.Array):
+        return lambda x: _sincosd_array(x)
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _skew(x, out=None):
+    X = np.empty((3, 3)) if out is None else out
+    X[0, 0] = 0.0
+    X[0, 1] = -x[2]
+    X[0, 2] = x[1]
+    X[1, 0] = x[2]
+    X[1, 1] = 0.0
+    X[1, 2] = -x[0]
+    X[2, 0] = -x[1]
+    X[2, 1] = x[0]
+    X[2, 2] = 0.0
+    return X
+
+
+def skew(x, out=None):
     """
     Return the 3-by-3 skew-symmetric matrix [Wiki_skew]_ of a 3-element vector x.
 
@@ -86,11 +223,25 @@ def skew(x):
     ----------
     x : array
         3-element array with values to be ordered in a skew-symmetric matrix.
+    out : numpy.ndarray, default: None
+        3-by-3 array where the result is written. If given, no new array is
+        allocated, which is useful when calling this function inside loops.
+
+    Notes
+    -----
+    Lists and column vectors are converted to a flat NumPy array before the
+    compiled routine is called. Inside Numba-compiled code only 1-dimensional
+    arrays are accepted.
+
+    When the skew-symmetric matrix is only needed to be multiplied, as in
+    filter updates evaluated at every sample, prefer :func:`skew_mul` or
+    :func:`skew_sq`, which skip building the matrix.
 
     Returns
     -------
     X : ndarray
-        3-by-3 numpy array of the skew-symmetric matrix.
+        3-by-3 numpy array of the skew-symmetric matrix. It is ``out`` itself,
+        if it was given.
 
     Examples
     --------
@@ -105,12 +256,171 @@ def skew(x):
     [[ 0. -6.  5.]
      [ 6.  0. -4.]
      [-5.  4.  0.]]
+    >>> buffer = np.empty((3, 3))
+    >>> X = skew(np.array([1.0, 2.0, 3.0]), out=buffer)
+    >>> buffer
+    [[ 0. -3.  2.]
+     [ 3.  0. -1.]
+     [-2.  1.  0.]]
 
     References
     ----------
     .. [Wiki_skew] https://en.wikipedia.org/wiki/Skew-symmetric_matrix
 
     """
+    x = np.asarray(x, dtype=float).ravel()
     if len(x) != 3:
         raise ValueError("Input must be an array with three elements")
-    return np.array([[0, -x[2], x[1]], [x[2], 0, -x[0]], [-x[1], x[0], 0.0]])
+    if out is None and _skew_aot is not None:
+        return _skew_aot(x)
+    return _skew(x, out)
+
+
+@overload(skew)
+def _skew_jit(x, out=None):
+    if isinstance(x, types.Array):
+        def impl(x, out=None):
+            if len(x) != 3:
+                raise ValueError("Input must be an array with three elements")
+            return _skew(x, out)
+        return impl
+
+
+@njit(parallel=True, cache=True, fastmath=True, boundscheck=False)
+def skew_batch(X, out=None):
+    """
+    Return the skew-symmetric matrices of N 3-element vectors.
+
+    This is the batched version of :func:`skew`. The matrices are stacked
+    along the first axis, so that they can be used directly with NumPy's
+    matrix multiplication over stacks of matrices.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        N-by-3 array with the vectors to be ordered in skew-symmetric matrices.
+    out : numpy.ndarray, default: None
+        N-by-3-by-3 array where the results are written. If given, no new
+        array is allocated.
+
+    Returns
+    -------
+    S : numpy.ndarray
+        N-by-3-by-3 array of skew-symmetric matrices. It is ``out`` itself, if
+        it was given.
+
+    Examples
+    --------
+    >>> from ahrs.common.mathfuncs import skew_batch
+    >>> S = skew_batch(np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]))
+    >>> S.shape
+    (2, 3, 3)
+    >>> S[1]
+    [[ 0. -6.  5.]
+     [ 6.  0. -4.]
+     [-5.  4.  0.]]
+
+    """
+    if X.shape[1] != 3:
+        raise ValueError("Input must be an N-by-3 array")
+    num_vectors = X.shape[0]
+    S = np.empty((num_vectors, 3, 3)) if out is None else out
+    for i in prange(num_vectors):
+        S[i, 0, 0] = 0.0
+        S[i, 0, 1] = -X[i, 2]
+        S[i, 0, 2] = X[i, 1]
+        S[i, 1, 0] = X[i, 2]
+        S[i, 1, 1] = 0.0
+        S[i, 1, 2] = -X[i, 0]
+        S[i, 2, 0] = -X[i, 1]
+        S[i, 2, 1] = X[i, 0]
+        S[i, 2, 2] = 0.0
+    return S
+
+
+@njit(cache=True, fastmath=True, boundscheck=False, inline='always')
+def skew_mul(w, M, out=None):
+    """
+    Return the product of the skew-symmetric matrix of `w` with a matrix `M`.
+
+    Computes :math:`\\lfloor\\mathbf{w}\\rfloor_\\times\\mathbf{M}` without
+    building the skew-symmetric matrix. Each column of the result is the
+    cross product of `w` with the corresponding column of `M`, so only its
+    six non-zero entries are multiplied.
+
+    Parameters
+    ----------
+    w : numpy.ndarray
+        3-element array.
+    M : numpy.ndarray
+        3-by-K array.
+    out : numpy.ndarray, default: None
+        3-by-K array where the result is written. It may be `M` itself.
+
+    Returns
+    -------
+    P : numpy.ndarray
+        3-by-K array equal to ``skew(w) @ M``.
+
+    Examples
+    --------
+    >>> from ahrs.common.mathfuncs import skew_mul
+    >>> skew_mul(np.array([1.0, 2.0, 3.0]), np.identity(3))
+    [[ 0. -3.  2.]
+     [ 3.  0. -1.]
+     [-2.  1.  0.]]
+
+    """
+    num_cols = M.shape[1]
+    P = np.empty((3, num_cols)) if out is None else out
+    for j in range(num_cols):
+        m0, m1, m2 = M[0, j], M[1, j], M[2, j]
+        P[0, j] = w[1]*m2 - w[2]*m1
+        P[1, j] = w[2]*m0 - w[0]*m2
+        P[2, j] = w[0]*m1 - w[1]*m0
+    return P
+
+
+@njit(cache=True, fastmath=True, boundscheck=False, inline='always')
+def skew_sq(w, out=None):
+    """
+    Return the square of the skew-symmetric matrix of `w`.
+
+    Uses the identity :math:`\\lfloor\\mathbf{w}\\rfloor_\\times^2 =
+    \\mathbf{ww}^T - \\|\\mathbf{w}\\|^2\\mathbf{I}_3`, which avoids
+    multiplying two skew-symmetric matrices. This term appears in Rodrigues'
+    rotation formula and in second-order integrations of angular rates.
+
+    Parameters
+    ----------
+    w : numpy.ndarray
+        3-element array.
+    out : numpy.ndarray, default: None
+        3-by-3 array where the result is written.
+
+    Returns
+    -------
+    P : numpy.ndarray
+        3-by-3 array equal to ``skew(w) @ skew(w)``.
+
+    Examples
+    --------
+    >>> from ahrs.common.mathfuncs import skew_sq
+    >>> skew_sq(np.array([1.0, 2.0, 3.0]))
+    [[-13.   2.   3.]
+     [  2. -10.   6.]
+     [  3.   6.  -5.]]
+
+    """
+    P = np.empty((3, 3)) if out is None else out
+    w0, w1, w2 = w[0], w[1], w[2]
+    P[0, 0] = -w1*w1 - w2*w2
+    P[0, 1] = w0*w1
+    P[0, 2] = w0*w2
+    P[1, 0] = w0*w1
+    P[1, 1] = -w0*w0 - w2*w2
+    P[1, 2] = w1*w2
+    P[2, 0] = w0*w2
+    P[2, 1] = w1*w2
+    P[2, 2] = -w0*w0 - w1*w1
+    return P
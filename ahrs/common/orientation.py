@@ -13,7 +13,7 @@ Notes
 
 from typing import Tuple, Union
 import numpy as np
-from .mathfuncs import cosd, sind
+from .mathfuncs import sincosd
 from .constants import *  # noqa W401
 from numba import njit, jit
 
@@ -349,8 +349,10 @@ def axang2quat(axis: np.ndarray, angle: Union[int, float], rad: bool = True) ->
     if len(axis)!= 3:
         raise ValueError()
     axis /= np.linalg.norm(axis)
-    qw = np.cos(angle/2.0) if rad else cosd(angle/2.0)
-    s = np.sin(angle/2.0) if rad else sind(angle/2.0)
+    if rad:
+        qw, s = np.cos(angle/2.0), np.sin(angle/2.0)
+    else:
+        s, qw = sincosd(angle/2.0)
     q = np.array([qw] + list(s*axis))
     return q/np.linalg.norm(q)
 
@@ -632,7 +634,7 @@ def rotation(ax: Union[str, int] = None, ang: float = 0.0) -> np.ndarray:
     if ax not in valid_axes:
         return I_3
     # Compute rotation
-    ca, sa = cosd(ang), sind(ang)
+    sa, ca = sincosd(ang)
     if ax.lower()=="x":
         return np.array([[1.0, 0.0, 0.0], [0.0, ca, -sa], [0.0, sa, ca]])
     if ax.lower()=="y":
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Ahead-of-time compilation of the Madgwick sweeps.
+
+The full-sweep kernels of :mod:`ahrs.filters.madgwick` are compiled into the
+extension module ``_madgwick_aot``, which is saved next to this file. If the
+extension is found, :class:`ahrs.filters.Madgwick` uses it for double
+precision data instead of compiling the same kernels just-in-time at their
+first call.
+
+Build it with::
+
+    python -m ahrs.filters._aot_madgwick
+
+"""
+
+import os
+from numba.pycc import CC
+from ahrs.filters.madgwick import _compute_all_imu, _compute_all_marg
+
+cc = CC('_madgwick_aot')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+@cc.export('run_imu', 'void(f8[::1], f8[:,::1], f8[:,::1], f8[::1], f8, f8)')
+def run_imu(Q, gyr, acc, acc_w, gain, Dt):
+    _compute_all_imu(Q, gyr, acc, acc_w, gain, Dt)
+
+
+@cc.export('run_marg', 'void(f8[::1], f8[:,::1], f8[:,::1], f8[::1], f8[:,::1], f8, f8)')
+def run_marg(Q, gyr, acc, acc_w, mag, gain, Dt):
+    _compute_all_marg(Q, gyr, acc, acc_w, mag, gain, Dt)
+
+
+if __name__ == '__main__':
+    cc.compile()
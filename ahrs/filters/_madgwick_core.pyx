@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Compiled sweeps of the Madgwick filter.
+
+Optional C implementation of :func:`ahrs.filters.madgwick._compute_all_imu`
+and :func:`ahrs.filters.madgwick._compute_all_marg`. When the extension is
+built (``python setup.py build_ext --inplace`` with Cython installed),
+:class:`ahrs.filters.Madgwick` uses it for the full-sweep path and falls
+back to the Numba kernels otherwise.
+
+The rows of ``acc`` and ``mag`` must be already normalized, ``acc_w`` holds the
+weights (1 or 0) of the valid samples and of those where ``acc`` or ``gyr`` is
+null or NaN, the invalid rows of ``gyr`` must be zeros, and all arrays must be
+C-contiguous and of type ``float64``. The extension is built for the generic
+target of the compiler unless ``AHRS_NATIVE_ARCH=1`` is set, which tunes it to
+the building machine.
+"""
+
+from libc.math cimport sqrt
+
+# Offset of the squared norm of the gradient, the single precision value
+# ``_TINY`` of the Numba kernels in :mod:`ahrs.filters.madgwick`, so that
+# both implementations give the same quaternions
+cdef double _TINY = <float>1e-30
+TINY = _TINY
+
+
+cdef inline void _imu_step(double* q, double gx, double gy, double gz,
+                           double ax, double ay, double az,
+                           double gain_dt, double half_dt, double* out) noexcept nogil:
+    cdef double qw = q[0], qx = q[1], qy = q[2], qz = q[3]
+    cdef double pw, px, py, pz, rx, ry, rz
+    cdef double f0, f1, f2, g0, g1, g2, g3, step, inv_q
+    # Gradient objective function (eq. 25)
+    f0 = 2.0 * (qx * qz - qw * qy)     - ax
+    f1 = 2.0 * (qw * qx + qy * qz)     - ay
+    f2 = 2.0 * (0.5 - qx*qx - qy*qy)   - az
+    # Objective Function Gradient J^T f with Jacobian (eq. 26)
+    g0 = -2.0*qy*f0 + 2.0*qx*f1                                  # (eq. 34)
+    g1 =  2.0*qz*f0 + 2.0*qw*f1 - 4.0*qx*f2
+    g2 = -2.0*qw*f0 + 2.0*qz*f1 - 4.0*qy*f2
+    g3 =  2.0*qx*f0 + 2.0*qy*f1
+    # Normalization of the gradient folded into the step size (eq. 33)
+    step = gain_dt / sqrt(g0*g0 + g1*g1 + g2*g2 + g3*g3 + _TINY)
+    # Integrate the corrected quaternion derivative (eqs. 12, 33 and 13),
+    # with 0.5*Dt folded into the angular rate
+    rx, ry, rz = half_dt*gx, half_dt*gy, half_dt*gz
+    pw = qw - qx*rx - qy*ry - qz*rz - step * g0
+    px = qx + qw*rx + qy*rz - qz*ry - step * g1
+    py = qy + qw*ry - qx*rz + qz*rx - step * g2
+    pz = qz + qw*rz + qx*ry - qy*rx - step * g3
+    inv_q = 1.0 / sqrt(pw*pw + px*px + py*py + pz*pz)
+    out[0] = pw*inv_q; out[1] = px*inv_q; out[2] = py*inv_q; out[3] = pz*inv_q
+
+
+cdef inline void _marg_step(double* q, double gx, double gy, double gz,
+                            double ax, double ay, double az,
+                            double mx, double my, double mz,
+                            double gain_dt, double half_dt, double* out) noexcept nogil:
+    cdef double qw = q[0], qx = q[1], qy = q[2], qz = q[3]
+    cdef double pw, px, py, pz, rx, ry, rz, hx, hy, bx, bz
+    cdef double f0, f1, f2, f3, f4, f5, g0, g1, g2, g3, step, inv_q
+    cdef double _2bx, _2bz, _2bxqw, _2bxqx, _2bxqy, _2bxqz
+    cdef double _2bzqw, _2bzqx, _2bzqy, _2bzqz
+    cdef double qwqx, qwqy, qwqz, qxqy, qxqz, qyqz, qx2, qy2, qz2
+    cdef double qxqz_qwqy, qwqy_qxqz, qwqx_qyqz, qxqy_qwqz
+    cdef double half_qx2_qy2, half_qy2_qz2
+    # Products of the quaternion components
+    qwqx, qwqy, qwqz = qw*qx, qw*qy, qw*qz
+    qxqy, qxqz, qyqz = qx*qy, qx*qz, qy*qz
+    qx2, qy2, qz2 = qx*qx, qy*qy, qz*qz
+    # Terms shared by the rotation, f and J (eqs. 45, 31 and 32)
+    qxqz_qwqy = qxqz - qwqy
+    qwqy_qxqz = qwqy + qxqz
+    qwqx_qyqz = qwqx + qyqz
+    qxqy_qwqz = qxqy - qwqz
+    half_qx2_qy2 = 0.5 - qx2 - qy2
+    half_qy2_qz2 = 0.5 - qy2 - qz2
+    # Rotate normalized magnetometer measurements (eq. 45), with q (0, m) q*
+    # written out as the rotation matrix of q
+    hx = 2.0*(mx*half_qy2_qz2 + my*qxqy_qwqz + mz*qwqy_qxqz)
+    hy = 2.0*(mx*(qxqy + qwqz) + my*(0.5 - qx2 - qz2) + mz*(qyqz - qwqx))
+    bz = 2.0*(mx*qxqz_qwqy + my*qwqx_qyqz + mz*half_qx2_qy2)
+    bx = sqrt(hx*hx + hy*hy)                                # (eq. 46)
+    # Repeated factors of f and J (eqs. 31 and 32)
+    _2bx, _2bz = 2.0*bx, 2.0*bz
+    _2bxqw, _2bxqx, _2bxqy, _2bxqz = _2bx*qw, _2bx*qx, _2bx*qy, _2bx*qz
+    _2bzqw, _2bzqx, _2bzqy, _2bzqz = _2bz*qw, _2bz*qx, _2bz*qy, _2bz*qz
+    # Gradient objective function (eq. 31)
+    f0 = 2.0*qxqz_qwqy   - ax
+    f1 = 2.0*qwqx_qyqz   - ay
+    f2 = 2.0*half_qx2_qy2 - az
+    f3 = _2bx*half_qy2_qz2 + _2bz*qxqz_qwqy   - mx
+    f4 = _2bx*qxqy_qwqz    + _2bz*qwqx_qyqz   - my
+    f5 = _2bx*qwqy_qxqz    + _2bz*half_qx2_qy2 - mz
+    # Objective Function Gradient J^T f with Jacobian (eq. 32), accumulated
+    # from the accelerometer block, as in the IMU update, ...
+    g0 = -2.0*qy*f0 + 2.0*qx*f1                                  # (eq. 34)
+    g1 =  2.0*qz*f0 + 2.0*qw*f1 - 4.0*qx*f2
+    g2 = -2.0*qw*f0 + 2.0*qz*f1 - 4.0*qy*f2
+    g3 =  2.0*qx*f0 + 2.0*qy*f1
+    # ... and the magnetometer block
+    g0 += -_2bzqy*f3                + (_2bzqx - _2bxqz)*f4 + _2bxqy*f5
+    g1 +=  _2bzqz*f3                + (_2bxqy + _2bzqw)*f4 + (_2bxqz - 2.0*_2bzqx)*f5
+    g2 += (-2.0*_2bxqy - _2bzqw)*f3 + (_2bxqx + _2bzqz)*f4 + (_2bxqw - 2.0*_2bzqy)*f5
+    g3 += (_2bzqx - 2.0*_2bxqz)*f3  + (_2bzqy - _2bxqw)*f4 + _2bxqx*f5
+    # Normalization of the gradient folded into the step size (eq. 33)
+    step = gain_dt / sqrt(g0*g0 + g1*g1 + g2*g2 + g3*g3 + _TINY)
+    # Integrate the corrected quaternion derivative (eqs. 12, 33 and 13),
+    # with 0.5*Dt folded into the angular rate
+    rx, ry, rz = half_dt*gx, half_dt*gy, half_dt*gz
+    pw = qw - qx*rx - qy*ry - qz*rz - step * g0
+    px = qx + qw*rx + qy*rz - qz*ry - step * g1
+    py = qy + qw*ry - qx*rz + qz*rx - step * g2
+    pz = qz + qw*rz + qx*ry - qy*rx - step * g3
+    inv_q = 1.0 / sqrt(pw*pw + px*px + py*py + pz*pz)
+    out[0] = pw*inv_q; out[1] = px*inv_q; out[2] = py*inv_q; out[3] = pz*inv_q
+
+
+cpdef void run_imu(double[:, ::1] Q, double[:, ::1] gyr, double[:, ::1] acc,
+                   double[::1] acc_w, double gain, double dt) noexcept nogil:
+    """Fill ``Q[1:]`` recursively from ``Q[0]`` with the IMU update."""
+    cdef Py_ssize_t t
+    cdef double gain_dt = gain * dt, half_dt = 0.5 * dt
+    for t in range(1, Q.shape[0]):
+        _imu_step(&Q[t-1, 0], gyr[t, 0], gyr[t, 1], gyr[t, 2],
+                  acc[t, 0], acc[t, 1], acc[t, 2], gain_dt*acc_w[t], half_dt,
+                  &Q[t, 0])
+
+
+cpdef void run_marg(double[:, ::1] Q, double[:, ::1] gyr, double[:, ::1] acc,
+                    double[::1] acc_w, double[:, ::1] mag, double gain,
+                    double dt) noexcept nogil:
+    """Fill ``Q[1:]`` recursively from ``Q[0]`` with the MARG update."""
+    cdef Py_ssize_t t
+    cdef double gain_dt = gain * dt, half_dt = 0.5 * dt
+    for t in range(1, Q.shape[0]):
+        _marg_step(&Q[t-1, 0], gyr[t, 0], gyr[t, 1], gyr[t, 2],
+                   acc[t, 0], acc[t, 1], acc[t, 2],
+                   mag[t, 0], mag[t, 1], mag[t, 2], gain_dt*acc_w[t], half_dt,
+                   &Q[t, 0])
@@ -900,7 +900,6 @@ spec = [
     ("has_mag", types.boolean),
     ("has_q0", types.boolean),
     ("Q", types.double[:, :]),
-    ("noises", types.double[:]),
     ("q", types.double[:]),
 ]
 
@@ -392,7 +392,11 @@ class FLAE:
             raise ValueError(f"Given method '{self.method}' is not valid. Try 'symbolic', 'eig' or 'newton'")
         # Reference measurements
         mdip = kw.get('magnetic_dip')                       # Magnetic dip, in degrees
-        mag_ref = np.array([MAG['X'], MAG['Y'], MAG['Z']]) if mdip is None else np.array([cosd(mdip), 0., -sind(mdip)])
+        if mdip is None:
+            mag_ref = np.array([MAG['X'], MAG['Y'], MAG['Z']])
+        else:
+            sd, cd = sincosd(mdip)
+            mag_ref = np.array([cd, 0., -sd])
         mag_ref /= np.linalg.norm(mag_ref)
         acc_ref = np.array([0.0, 0.0, 1.0])
         self.ref = np.vstack((acc_ref, mag_ref))
@@ -290,7 +290,11 @@ class Fourati:
         self.q0 = kwargs.get('q0')
         # Reference measurements
         mdip = kwargs.get('magnetic_dip')             # Magnetic dip, in degrees
-        self.m_q = np.array([0.0, MAG['X'], MAG['Y'], MAG['Z']]) if mdip is None else np.array([0.0, cosd(mdip), 0.0, sind(mdip)])
+        if mdip is None:
+            self.m_q = np.array([0.0, MAG['X'], MAG['Y'], MAG['Z']])
+        else:
+            sd, cd = sincosd(mdip)
+            self.m_q = np.array([0.0, cd, 0.0, sd])
         self.m_q /= np.linalg.norm(self.m_q)
         self.g_q = np.array([0.0, 0.0, 0.0, 1.0])     # Normalized Gravity vector
         # Process of given data
@@ -369,26 +369,276 @@ References
 
 """  # noqa
 
+import math
+from functools import lru_cache
 import numpy as np
-from ..common.orientation import q_prod, q_conj, acc2q, am2q, q_rot_g
-from numba import types
-from numba.experimental import jitclass
-
-spec = [
-    ("acc", types.double[:, :]),
-    ("gyr", types.double[:, :]),
-    ("mag", types.double[:, :]),
-    ("q0", types.double[:]),
-    ("gain", types.double),
-    ("frequency", types.double),
-    ("method", types.unicode_type),
-    ("Dt", types.double),
-    ("has_mag", types.boolean),
-    ("Q", types.double[:, :])
-]
-
-
-@jitclass(spec)
+from ..common.orientation import acc2q, am2q
+from numba import njit, prange
+try:
+    from ._madgwick_core import run_imu as _run_imu_c, run_marg as _run_marg_c
+except ImportError:
+    _run_imu_c = _run_marg_c = None
+try:
+    # Kernels compiled ahead-of-time with ``python -m ahrs.filters._aot_madgwick``
+    from ._madgwick_aot import run_imu as _run_imu_aot, run_marg as _run_marg_aot
+except ImportError:
+    _run_imu_aot = _run_marg_aot = None
+
+# Constants of the kernels typed in single precision, so that they do not
+# upcast float32 data. All of them are exact, so double precision results
+# are the same as with float64 literals.
+_HALF, _ONE, _TWO, _FOUR = np.float32(0.5), np.float32(1.0), np.float32(2.0), np.float32(4.0)  # noqa E501
+_TINY = np.float32(1e-30)  # also the offset of _madgwick_core.pyx
+
+# Fast-math flags without 'nnan' and 'ninf', for the kernels that test their
+# input against NaN: with those flags LLVM may assume the tests always pass
+_FASTMATH_NAN_SAFE = {'contract', 'arcp', 'nsz', 'afn', 'reassoc'}
+
+
+@njit(cache=True, fastmath=True)
+def _imu_step(qw: float, qx: float, qy: float, qz: float, gx: float, gy: float, gz: float, ax: float, ay: float, az: float, gain_dt: float, half_dt: float) -> tuple:  # noqa E501
+    """IMU update with a normalized accelerometer sample ``(ax, ay, az)``.
+
+    The loop invariants ``gain_dt = gain*Dt`` and ``half_dt = 0.5*Dt`` are
+    given by the caller, who sets ``gain_dt`` to zero for a null
+    accelerometer sample to cancel the gradient correction. A null
+    gyroscope sample with a null ``gain_dt`` leaves the quaternion
+    unchanged, so the step has no branch. The quaternion is passed and
+    returned as scalars, so that the sweeps carry it in registers from one
+    sample to the next.
+    """
+    # Gradient objective function (eq. 25)
+    f0 = _TWO * (qx * qz - qw * qy)     - ax
+    f1 = _TWO * (qw * qx + qy * qz)     - ay
+    f2 = _TWO * (_HALF - qx*qx - qy*qy) - az
+    # Objective Function Gradient J^T f with Jacobian (eq. 26)
+    g0 = -_TWO*qy*f0 + _TWO*qx*f1                                # (eq. 34)
+    g1 =  _TWO*qz*f0 + _TWO*qw*f1 - _FOUR*qx*f2
+    g2 = -_TWO*qw*f0 + _TWO*qz*f1 - _FOUR*qy*f2
+    g3 =  _TWO*qx*f0 + _TWO*qy*f1
+    # Normalization of the gradient folded into the step size (eq. 33); a
+    # null gradient cancels the correction without branching
+    step = gain_dt / math.sqrt(g0*g0 + g1*g1 + g2*g2 + g3*g3 + _TINY)
+    # Integrate the corrected quaternion derivative (eqs. 12, 33 and 13),
+    # with 0.5*Dt folded into the angular rate
+    rx, ry, rz = half_dt*gx, half_dt*gy, half_dt*gz
+    pw = qw - qx*rx - qy*ry - qz*rz - step * g0
+    px = qx + qw*rx + qy*rz - qz*ry - step * g1
+    py = qy + qw*ry - qx*rz + qz*rx - step * g2
+    pz = qz + qw*rz + qx*ry - qy*rx - step * g3
+    inv_q = _ONE / math.sqrt(pw*pw + px*px + py*py + pz*pz)
+    return pw*inv_q, px*inv_q, py*inv_q, pz*inv_q
+
+
+@njit(cache=True, fastmath=True)
+def _marg_step(qw: float, qx: float, qy: float, qz: float, gx: float, gy: float, gz: float, ax: float, ay: float, az: float, mx: float, my: float, mz: float, gain_dt: float, half_dt: float) -> tuple:  # noqa E501
+    """MARG update with normalized samples ``(ax, ay, az)`` and ``(mx, my, mz)``.
+
+    The loop invariants ``gain_dt = gain*Dt`` and ``half_dt = 0.5*Dt`` are
+    given by the caller, who sets ``gain_dt`` to zero for a null
+    accelerometer sample to cancel the gradient correction. The quaternion
+    is passed and returned as scalars. A null magnetometer sample cancels
+    ``h``, ``b`` and the magnetic residuals, which reduces the step to the
+    IMU update without branching.
+    """
+    # Products of the quaternion components
+    qwqx, qwqy, qwqz = qw*qx, qw*qy, qw*qz
+    qxqy, qxqz, qyqz = qx*qy, qx*qz, qy*qz
+    qx2, qy2, qz2 = qx*qx, qy*qy, qz*qz
+    # Terms shared by the rotation, f and J (eqs. 45, 31 and 32)
+    qxqz_qwqy = qxqz - qwqy
+    qwqy_qxqz = qwqy + qxqz
+    qwqx_qyqz = qwqx + qyqz
+    qxqy_qwqz = qxqy - qwqz
+    half_qx2_qy2 = _HALF - qx2 - qy2
+    half_qy2_qz2 = _HALF - qy2 - qz2
+    # Rotate normalized magnetometer measurements (eq. 45), with q (0, m) q*
+    # written out as the rotation matrix of q
+    hx = _TWO*(mx*half_qy2_qz2 + my*qxqy_qwqz + mz*qwqy_qxqz)
+    hy = _TWO*(mx*(qxqy + qwqz) + my*(_HALF - qx2 - qz2) + mz*(qyqz - qwqx))
+    bz = _TWO*(mx*qxqz_qwqy + my*qwqx_qyqz + mz*half_qx2_qy2)
+    bx = math.sqrt(hx*hx + hy*hy)                                # (eq. 46)
+    # Repeated factors of f and J (eqs. 31 and 32)
+    _2bx, _2bz = _TWO*bx, _TWO*bz
+    _2bxqw, _2bxqx, _2bxqy, _2bxqz = _2bx*qw, _2bx*qx, _2bx*qy, _2bx*qz
+    _2bzqw, _2bzqx, _2bzqy, _2bzqz = _2bz*qw, _2bz*qx, _2bz*qy, _2bz*qz
+    # Gradient objective function (eq. 31)
+    f0 = _TWO*qxqz_qwqy   - ax
+    f1 = _TWO*qwqx_qyqz   - ay
+    f2 = _TWO*half_qx2_qy2 - az
+    f3 = _2bx*half_qy2_qz2 + _2bz*qxqz_qwqy   - mx
+    f4 = _2bx*qxqy_qwqz    + _2bz*qwqx_qyqz   - my
+    f5 = _2bx*qwqy_qxqz    + _2bz*half_qx2_qy2 - mz
+    # Objective Function Gradient J^T f with Jacobian (eq. 32), accumulated
+    # from the accelerometer block, as in the IMU update, ...
+    g0 = -_TWO*qy*f0 + _TWO*qx*f1                                # (eq. 34)
+    g1 =  _TWO*qz*f0 + _TWO*qw*f1 - _FOUR*qx*f2
+    g2 = -_TWO*qw*f0 + _TWO*qz*f1 - _FOUR*qy*f2
+    g3 =  _TWO*qx*f0 + _TWO*qy*f1
+    # ... and the magnetometer block
+    g0 += -_2bzqy*f3                 + (_2bzqx - _2bxqz)*f4 + _2bxqy*f5
+    g1 +=  _2bzqz*f3                 + (_2bxqy + _2bzqw)*f4 + (_2bxqz - _TWO*_2bzqx)*f5
+    g2 += (-_TWO*_2bxqy - _2bzqw)*f3 + (_2bxqx + _2bzqz)*f4 + (_2bxqw - _TWO*_2bzqy)*f5
+    g3 += (_2bzqx - _TWO*_2bxqz)*f3  + (_2bzqy - _2bxqw)*f4 + _2bxqx*f5
+    # Normalization of the gradient folded into the step size (eq. 33); a
+    # null gradient cancels the correction without branching
+    step = gain_dt / math.sqrt(g0*g0 + g1*g1 + g2*g2 + g3*g3 + _TINY)
+    # Integrate the corrected quaternion derivative (eqs. 12, 33 and 13),
+    # with 0.5*Dt folded into the angular rate
+    rx, ry, rz = half_dt*gx, half_dt*gy, half_dt*gz
+    pw = qw - qx*rx - qy*ry - qz*rz - step * g0
+    px = qx + qw*rx + qy*rz - qz*ry - step * g1
+    py = qy + qw*ry - qx*rz + qz*rx - step * g2
+    pz = qz + qw*rz + qx*ry - qy*rx - step * g3
+    inv_q = _ONE / math.sqrt(pw*pw + px*px + py*py + pz*pz)
+    return pw*inv_q, px*inv_q, py*inv_q, pz*inv_q
+
+
+@njit(cache=True, fastmath=_FASTMATH_NAN_SAFE)
+def _update_imu(q: np.ndarray, gyr_sample: np.ndarray, acc_sample: np.ndarray, gain: float, Dt: float, out: np.ndarray) -> np.ndarray:  # noqa E501
+    """Compiled IMU update. See :meth:`Madgwick.updateIMU`."""
+    gx, gy, gz = gyr_sample[0], gyr_sample[1], gyr_sample[2]
+    if not gx*gx + gy*gy + gz*gz > 0.0:
+        # Null or NaN sample: no update
+        out[:] = q
+        return out
+    ax, ay, az = acc_sample[0], acc_sample[1], acc_sample[2]
+    a_norm = math.sqrt(ax*ax + ay*ay + az*az)
+    gain_dt = 0.0
+    if a_norm > 0:
+        ax, ay, az = ax/a_norm, ay/a_norm, az/a_norm
+        gain_dt = gain*Dt
+    else:
+        # Null or NaN sample: no correction
+        ax, ay, az = 0.0, 0.0, 0.0
+    out[0], out[1], out[2], out[3] = _imu_step(q[0], q[1], q[2], q[3], gx, gy, gz, ax, ay, az, gain_dt, _HALF*Dt)  # noqa E501
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH_NAN_SAFE)
+def _update_marg(q: np.ndarray, gyr_sample: np.ndarray, acc_sample: np.ndarray, mag_sample: np.ndarray, gain: float, Dt: float, out: np.ndarray) -> np.ndarray:  # noqa E501
+    """Compiled MARG update. See :meth:`Madgwick.updateMARG`."""
+    gx, gy, gz = gyr_sample[0], gyr_sample[1], gyr_sample[2]
+    if not gx*gx + gy*gy + gz*gz > 0.0:
+        # Null or NaN sample: no update
+        out[:] = q
+        return out
+    ax, ay, az = acc_sample[0], acc_sample[1], acc_sample[2]
+    a_norm = math.sqrt(ax*ax + ay*ay + az*az)
+    gain_dt = 0.0
+    if a_norm > 0:
+        ax, ay, az = ax/a_norm, ay/a_norm, az/a_norm
+        gain_dt = gain*Dt
+    else:
+        # Null or NaN sample: no correction
+        ax, ay, az = 0.0, 0.0, 0.0
+    mx, my, mz = mag_sample[0], mag_sample[1], mag_sample[2]
+    m_norm = math.sqrt(mx*mx + my*my + mz*mz)
+    if m_norm > 0:
+        mx, my, mz = mx/m_norm, my/m_norm, mz/m_norm
+    else:
+        # Null or NaN sample: reduces to the IMU update
+        mx, my, mz = 0.0, 0.0, 0.0
+    out[0], out[1], out[2], out[3] = _marg_step(q[0], q[1], q[2], q[3], gx, gy, gz, ax, ay, az, mx, my, mz, gain_dt, _HALF*Dt)  # noqa E501
+    return out
+
+
+@njit(cache=True, fastmath=True)
+def _sweep(Q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, acc_w: np.ndarray, mag: np.ndarray, gain_dt: float, half_dt: float) -> None:  # noqa E501
+    """Loop of all the sweeps, with the MARG update, or the IMU update if
+    ``mag`` is None.
+
+    The branch on ``mag`` is resolved when the kernel is compiled, so each
+    update has its own loop without test. ``gain_dt`` and ``half_dt`` are
+    the products ``gain*Dt`` and ``0.5*Dt``.
+    """
+    qw, qx, qy, qz = Q[0], Q[1], Q[2], Q[3]
+    for t in range(1, gyr.shape[0]):
+        if mag is None:
+            qw, qx, qy, qz = _imu_step(qw, qx, qy, qz, gyr[t, 0], gyr[t, 1], gyr[t, 2], acc[t, 0], acc[t, 1], acc[t, 2], gain_dt*acc_w[t], half_dt)  # noqa E501
+        else:
+            qw, qx, qy, qz = _marg_step(qw, qx, qy, qz, gyr[t, 0], gyr[t, 1], gyr[t, 2], acc[t, 0], acc[t, 1], acc[t, 2], mag[t, 0], mag[t, 1], mag[t, 2], gain_dt*acc_w[t], half_dt)  # noqa E501
+        i = 4 * t
+        Q[i], Q[i + 1], Q[i + 2], Q[i + 3] = qw, qx, qy, qz
+
+
+@njit(cache=True, fastmath=True)
+def _compute_all_imu(Q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, acc_w: np.ndarray, gain: float, Dt: float) -> None:  # noqa E501
+    """Fill ``Q[4:]`` recursively from ``Q[:4]`` with the IMU update.
+
+    ``Q`` is the flat buffer of an N-by-4 array, whose quaternion at time
+    ``t`` is ``Q[4*t:4*t+4]``. The rows of ``acc`` must be already
+    normalized, and ``acc_w`` is 1 for the valid samples and 0 where
+    ``acc`` or ``gyr`` is null or NaN, as given by :meth:`Madgwick._weights`,
+    which also zeroes the invalid rows of ``gyr``.
+    """
+    _sweep(Q, gyr, acc, acc_w, None, gain * Dt, _HALF * Dt)
+
+
+@njit(cache=True, fastmath=True)
+def _compute_all_marg(Q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, acc_w: np.ndarray, mag: np.ndarray, gain: float, Dt: float) -> None:  # noqa E501
+    """Fill ``Q[4:]`` recursively from ``Q[:4]`` with the MARG update.
+
+    ``Q`` is the flat buffer of an N-by-4 array, whose quaternion at time
+    ``t`` is ``Q[4*t:4*t+4]``. The rows of ``acc`` and ``mag`` must be
+    already normalized, and ``acc_w`` is 1 for the valid samples and 0 where
+    ``acc`` or ``gyr`` is null or NaN, as given by :meth:`Madgwick._weights`,
+    which also zeroes the invalid rows of ``gyr``.
+    """
+    _sweep(Q, gyr, acc, acc_w, mag, gain * Dt, _HALF * Dt)
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _run_batch_imu(Q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, acc_w: np.ndarray, gain: float, Dt: float) -> None:  # noqa E501
+    """Fill the flat buffer ``Q[m]`` of each of the M recordings in parallel."""
+    for m in prange(Q.shape[0]):
+        _compute_all_imu(Q[m], gyr[m], acc[m], acc_w[m], gain, Dt)
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _run_batch_marg(Q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, acc_w: np.ndarray, mag: np.ndarray, gain: float, Dt: float) -> None:  # noqa E501
+    """Fill the flat buffer ``Q[m]`` of each of the M recordings in parallel."""
+    for m in prange(Q.shape[0]):
+        _compute_all_marg(Q[m], gyr[m], acc[m], acc_w[m], mag[m], gain, Dt)
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _rot_g_batch(Q: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Rotate [0, 0, 1] by each quaternion of ``Q``, like ``q_rot_g``.
+
+    The N-by-3 result is written into ``out``, which is also returned.
+    """
+    qw, qx, qy, qz = Q[:, 0], Q[:, 1], Q[:, 2], Q[:, 3]
+    for i in prange(Q.shape[0]):
+        out[i, 0] = -_TWO * (qw[i] * qy[i] - qx[i] * qz[i])
+        out[i, 1] = _TWO * (qw[i] * qx[i] + qy[i] * qz[i])
+        out[i, 2] = _ONE - _TWO * (qx[i] * qx[i] + qy[i] * qy[i])
+    return out
+
+
+@lru_cache(maxsize=32)
+def _specialized_sweep(has_mag: bool, gain: float, Dt: float, dtype: str = 'float64'):  # noqa E501
+    """Sweep kernel compiled with ``gain`` and ``Dt`` frozen as constants.
+
+    The returned function has the signature of :func:`_compute_all_imu` (or
+    of :func:`_compute_all_marg` if ``has_mag``) without the ``gain`` and
+    ``Dt`` arguments, and runs the loop of :func:`_sweep`. The constants are
+    frozen with the precision ``dtype`` of the data. One kernel is compiled
+    per distinct set of arguments, and the 32 most recent ones are kept.
+    """
+    gain_dt, half_dt = np.dtype(dtype).type(gain * Dt), np.dtype(dtype).type(0.5 * Dt)  # noqa E501
+    if has_mag:
+        @njit(fastmath=True)
+        def sweep(Q, gyr, acc, acc_w, mag):
+            _sweep(Q, gyr, acc, acc_w, mag, gain_dt, half_dt)
+        return sweep
+
+    @njit(fastmath=True)
+    def sweep(Q, gyr, acc, acc_w):
+        _sweep(Q, gyr, acc, acc_w, None, gain_dt, half_dt)
+    return sweep
+
+
 class Madgwick:
     r"""Madgwick's Gradient Descent Orientation Filter
 
@@ -416,6 +666,16 @@ class Madgwick:
         MARG implementations.
     q0 : numpy.ndarray, default: None
         Initial orientation, as a versor (normalized quaternion).
+    dtype : numpy.dtype, default: numpy.float64
+        Floating-point type of the estimated quaternions. Using
+        ``numpy.float32`` halves the memory traffic of the full sweep, at the
+        cost of precision. Other types raise a ``ValueError``.
+    specialize : bool, default: False
+        Compile the full sweep with the values of ``gain`` and ``Dt`` folded
+        in as constants. The kernel is compiled once per distinct pair of
+        values and reused afterwards, so it only pays off when many
+        recordings are processed with exactly the same ``gain`` and ``Dt``:
+        any other value compiles a new kernel.
 
     Attributes
     ----------
@@ -433,6 +693,8 @@ class Madgwick:
         Filter gain.
     q0 : numpy.ndarray
         Initial orientation, as a versor (normalized quaternion).
+    dtype : numpy.dtype
+        Floating-point type of the estimated quaternions.
 
     Raises
     ------
@@ -463,7 +725,13 @@ class Madgwick:
     >>> madgwick = Madgwick()
     >>> Q = np.tile([1., 0., 0., 0.], (num_samples, 1)) # Allocate for quaternions
     >>> for t in range(1, num_samples):
-    ...     Q[t] = madgwick.updateIMU(Q[t-1], gyr=gyro_data[t], acc=acc_data[t])
+    ...     Q[t] = madgwick.updateIMU(Q[t-1], gyr_sample=gyro_data[t], acc_sample=acc_data[t])
+
+    Such a loop pays the cost of a Python call for every sample. When all
+    samples are available beforehand, it is much faster to give the full
+    arrays to the constructor: the sensor samples are then normalized all at
+    once, and only the recursion of the quaternions runs sample by sample, in
+    compiled code.
 
     Further on, we can also use magnetometer data.
 
@@ -496,7 +764,7 @@ class Madgwick:
     >>> Q[0] = [1.0, 0.0, 0.0, 0.0]         # Initial attitude as a quaternion
     >>> for t in range(1, num_samples):
     >>>     madgwick.Dt = new_sample_rate
-    ...     Q[t] = madgwick.updateIMU(Q[t-1], gyr=gyro_data[t], acc=acc_data[t])
+    ...     Q[t] = madgwick.updateIMU(Q[t-1], gyr_sample=gyro_data[t], acc_sample=acc_data[t])
 
     Madgwick's algorithm uses a gradient descent method to correct the
     estimation of the attitude. The **step size**, a.k.a.
@@ -513,19 +781,17 @@ class Madgwick:
     def __init__(self, gyr: np.ndarray = None, acc: np.ndarray = None,
                  mag: np.ndarray = None, q0: np.ndarray = None,
                  gain: float = None, frequency: float = 100., Dt: float = None,
-                 beta: float = None):
-        if gyr is not None and acc is not None:
-            self.gyr = gyr
-            self.acc = acc
-            do_computation = True
-        else:  # self.acc and self.gyr can't be set to None due to numba typing
-            do_computation = False
-
-        if mag is not None:
-            self.mag = mag
-            self.has_mag = True
-        else:  # self.mag can't be set to None due to numba typing
-            self.has_mag = False
+                 beta: float = None, dtype: np.dtype = np.float64,
+                 specialize: bool = False):
+        self.gyr = gyr
+        self.acc = acc
+        self.mag = mag
+        self.has_mag = mag is not None
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError("dtype must be numpy.float32 or numpy.float64")
+        self.specialize = specialize
+        do_computation = gyr is not None and acc is not None
 
         if Dt is None:
             self.frequency = frequency
@@ -547,6 +813,7 @@ class Madgwick:
         if do_computation:  # If acc and gyr were provided
             # Grab q0 for the inputs or precompute it
             if q0 is not None:
+                q0 = np.asarray(q0, dtype=float)
                 self.q0 = q0 / np.linalg.norm(q0)
             elif self.has_mag:
                 self.q0 = am2q(self.acc[0], self.mag[0])
@@ -571,21 +838,160 @@ class Madgwick:
         if self.acc.shape != self.gyr.shape:
             raise ValueError("acc and gyr are not the same size")
         num_samples = len(self.acc)
-        Q = np.zeros((num_samples, 4))
+        # Flat buffer of the quaternions, returned as an N-by-4 view
+        Q_flat = np.zeros(4*num_samples, dtype=self.dtype)
+        Q = Q_flat.reshape(num_samples, 4)
         Q[0] = self.q0
+        gyr = np.ascontiguousarray(self.gyr, dtype=self.dtype)
+        # Normalize all accelerometer samples at once
+        gyr, acc, acc_w = self._weights(gyr, np.asarray(self.acc, dtype=self.dtype))  # noqa E501
+        # The compiled extensions are only built for double precision
+        use_c = self.dtype == np.float64
+        # Parameters of the sweeps, read once and in the precision of the data
+        gain, Dt = self.dtype.type(self.gain), self.dtype.type(self.Dt)
+        if self.specialize:
+            sweep = _specialized_sweep(self.has_mag, float(self.gain), float(self.Dt), self.dtype.name)  # noqa E501
         # Compute with IMU architecture
         if not self.has_mag:
-            for t in range(1, num_samples):
-                Q[t] = self.updateIMU(Q[t - 1], self.gyr[t], self.acc[t])
+            if self.specialize:
+                sweep(Q_flat, gyr, acc, acc_w)
+            elif use_c and _run_imu_c is not None:
+                _run_imu_c(Q, gyr, acc, acc_w, gain, Dt)
+            elif use_c and _run_imu_aot is not None:
+                _run_imu_aot(Q_flat, gyr, acc, acc_w, gain, Dt)
+            else:
+                _compute_all_imu(Q_flat, gyr, acc, acc_w, gain, Dt)
             return Q
         # Compute with MARG architecture
         if self.mag.shape != self.gyr.shape:
             raise ValueError("mag and gyr are not the same size")
-        for t in range(1, num_samples):
-            Q[t] = self.updateMARG(Q[t - 1], self.gyr[t], self.acc[t], self.mag[t])  # noqa E501
+        mag = self._normalize_rows(np.asarray(self.mag, dtype=self.dtype))[0]
+        if self.specialize:
+            sweep(Q_flat, gyr, acc, acc_w, mag)
+        elif use_c and _run_marg_c is not None:
+            _run_marg_c(Q, gyr, acc, acc_w, mag, gain, Dt)
+        elif use_c and _run_marg_aot is not None:
+            _run_marg_aot(Q_flat, gyr, acc, acc_w, mag, gain, Dt)
+        else:
+            _compute_all_marg(Q_flat, gyr, acc, acc_w, mag, gain, Dt)
+        return Q
+
+    @classmethod
+    def run_batch(cls, gyrs: np.ndarray, accs: np.ndarray, mags: np.ndarray = None, q0s: np.ndarray = None, gain: float = None, frequency: float = 100., Dt: float = None) -> np.ndarray:  # noqa E501
+        """Estimate the quaternions of M independent recordings in parallel.
+
+        Each recording is filtered exactly as :class:`Madgwick` would do it
+        with the full-sweep path, but the M recordings are distributed over
+        the available cores.
+
+        Parameters
+        ----------
+        gyrs : numpy.ndarray
+            M-by-N-by-3 array with the gyroscope samples, in rad/s, of M
+            recordings of N samples each.
+        accs : numpy.ndarray
+            M-by-N-by-3 array with the accelerometer samples, in m/s^2.
+        mags : numpy.ndarray, default: None
+            M-by-N-by-3 array with the magnetometer samples, in mT. If given,
+            the MARG update is used.
+        q0s : numpy.ndarray, default: None
+            M-by-4 array with the initial orientation of each recording. If
+            not given, they are estimated from the first samples.
+        gain : float, default: {0.033, 0.041}
+            Filter gain. Defaults to 0.033 for IMU implementations, or to
+            0.041 for MARG implementations.
+        frequency : float, default: 100.0
+            Sampling frequency in Herz.
+        Dt : float, default: 0.01
+            Sampling step in seconds. Not required if `frequency` is given.
+
+        Returns
+        -------
+        Q : numpy.ndarray
+            M-by-N-by-4 array with the estimated quaternions.
+
+        Raises
+        ------
+        ValueError
+            When dimension of input arrays ``accs``, ``gyrs``, ``mags`` or
+            ``q0s`` do not match.
+
+        Examples
+        --------
+        >>> Q = Madgwick.run_batch(gyro_sessions, acc_sessions)
+        >>> Q.shape
+        (8, 1000, 4)
+
+        """
+        if Dt is None:
+            Dt = 1. / frequency
+        if gain is None:
+            gain = 0.033 if mags is None else 0.041
+        gyrs = np.asarray(gyrs, dtype=float)
+        accs = np.asarray(accs, dtype=float)
+        if gyrs.ndim != 3 or gyrs.shape[2] != 3:
+            raise ValueError("gyrs must be of shape (M, N, 3)")
+        if accs.shape != gyrs.shape:
+            raise ValueError("accs and gyrs are not the same size")
+        if mags is not None:
+            mags = np.asarray(mags, dtype=float)
+            if mags.shape != gyrs.shape:
+                raise ValueError("mags and gyrs are not the same size")
+        Q = np.zeros(gyrs.shape[:2] + (4,))
+        if q0s is not None:
+            q0s = np.asarray(q0s, dtype=float)
+            if q0s.shape != (len(gyrs), 4):
+                raise ValueError("q0s must be of shape (M, 4)")
+            Q[:, 0] = q0s / np.linalg.norm(q0s, axis=1, keepdims=True)
+        elif mags is not None:
+            Q[:, 0] = [am2q(a, m) for a, m in zip(accs[:, 0], mags[:, 0])]
+        else:
+            Q[:, 0] = [acc2q(a) for a in accs[:, 0]]
+        gyrs, accs, accs_w = cls._weights(gyrs, accs)
+        Q_flat = Q.reshape(len(Q), -1)
+        if mags is None:
+            _run_batch_imu(Q_flat, gyrs, accs, accs_w, gain, Dt)
+        else:
+            _run_batch_marg(Q_flat, gyrs, accs, accs_w, cls._normalize_rows(mags)[0], gain, Dt)  # noqa E501
         return Q
 
-    def updateIMU(self, q: np.ndarray, gyr_sample: np.ndarray, acc_sample: np.ndarray) -> np.ndarray:  # noqa E501
+    @staticmethod
+    def _normalize_rows(X: np.ndarray) -> tuple:
+        """Divide each row (along the last axis) of a float array by its norm.
+
+        Rows with a null or NaN norm are returned as zeros. Also returns the
+        weights of the rows, equal to 1 for the valid rows and 0 for the other
+        ones, so that the sweeps can cancel the correction of an invalid
+        sample without branching. Both arrays keep the precision of ``X`` and
+        are C-contiguous, as the compiled sweeps require, whatever the memory
+        layout of ``X``.
+        """
+        sq_norms = np.einsum('...i,...i->...', X, X)
+        valid = sq_norms > 0
+        inv_norms = np.zeros_like(sq_norms)
+        np.reciprocal(np.sqrt(sq_norms), out=inv_norms, where=valid)
+        X_unit = np.zeros(X.shape, dtype=X.dtype)
+        np.multiply(X, inv_norms[..., None], out=X_unit, where=valid[..., None])
+        return X_unit, valid.astype(X.dtype)
+
+    @classmethod
+    def _weights(cls, gyr: np.ndarray, acc: np.ndarray) -> tuple:
+        """Normalize the rows of ``acc`` and weight the samples of the sweeps.
+
+        The weights are equal to 1 for the valid samples, and to 0 where the
+        accelerometer or the gyroscope sample is null or NaN. The invalid
+        rows of ``gyr`` are replaced by zeros, in a copy. A null weight and a
+        null angular rate keep the orientation unchanged at an invalid
+        gyroscope sample, as :meth:`updateIMU` does.
+        """
+        acc, acc_w = cls._normalize_rows(acc)
+        gyr_valid = np.einsum('...i,...i->...', gyr, gyr) > 0
+        if not gyr_valid.all():
+            gyr = np.where(gyr_valid[..., None], gyr, 0.0).astype(gyr.dtype)
+            acc_w[~gyr_valid] = 0
+        return gyr, acc, acc_w
+
+    def updateIMU(self, q: np.ndarray, gyr_sample: np.ndarray, acc_sample: np.ndarray, out: np.ndarray = None) -> np.ndarray:  # noqa E501
         """
         Quaternion Estimation with IMU architecture.
 
@@ -597,6 +1003,10 @@ class Madgwick:
             Sample of tri-axial Gyroscope in rad/s
         acc_sample : numpy.ndarray
             Sample of tri-axial Accelerometer in m/s^2
+        out : numpy.ndarray, default: None
+            Array of 4 elements where the estimated quaternion is written,
+            e.g. the next row of a preallocated array ``Q``. A new array is
+            allocated if not given.
 
         Returns
         -------
@@ -613,7 +1023,14 @@ class Madgwick:
         >>> madgwick = Madgwick()
         >>> Q = np.tile([1., 0., 0., 0.], (len(gyro_data), 1)) # Allocate for quaternions
         >>> for t in range(1, num_samples):
-        ...   Q[t] = madgwick.updateIMU(Q[t-1], gyr=gyro_data[t], acc=acc_data[t])
+        ...   Q[t] = madgwick.updateIMU(Q[t-1], gyr_sample=gyro_data[t], acc_sample=acc_data[t])
+        ...
+
+        The estimation can also be written in place, without allocating a new
+        array at each step:
+
+        >>> for t in range(1, num_samples):
+        ...   madgwick.updateIMU(Q[t-1], gyr_sample=gyro_data[t], acc_sample=acc_data[t], out=Q[t])
         ...
 
         Or giving the data directly in the class constructor will estimate all
@@ -627,29 +1044,16 @@ class Madgwick:
         stored as quaternions.
 
         """  # noqa
-        if gyr_sample is None or not np.linalg.norm(gyr_sample) > 0:
-            return q
-        qDot = 0.5 * q_prod(q, np.append(0., gyr_sample))            # (eq. 12)
-        a_norm = np.linalg.norm(acc_sample)
-        if a_norm > 0:
-            a = acc_sample / a_norm
-            qw, qx, qy, qz = q / np.linalg.norm(q)
-            # Gradient objective function (eq. 25) and Jacobian (eq. 26)
-            f = np.array([2.0 * (qx * qz - qw * qy)   - a[0],
-                          2.0 * (qw * qx + qy * qz)   - a[1],
-                          2.0 * (0.5 - qx**2 - qy**2) - a[2]])       # (eq. 25)
-            J = np.array([[-2.0 * qy,  2.0 * qz, -2.0 * qw, 2.0 * qx],
-                          [ 2.0 * qx,  2.0 * qw,  2.0 * qz, 2.0 * qy],
-                          [ 0.0,    -4.0 * qx, -4.0 * qy, 0.0   ]])  # (eq. 26)
-            # Objective Function Gradient
-            gradient = J.T @ f                                       # (eq. 34)
-            gradient /= np.linalg.norm(gradient)
-            qDot -= self.gain * gradient                             # (eq. 33)
-        q += qDot * self.Dt                                          # (eq. 13)
-        q /= np.linalg.norm(q)
-        return q
-
-    def updateMARG(self, q: np.ndarray, gyr_sample: np.ndarray, acc_sample: np.ndarray, mag_sample: np.ndarray) -> np.ndarray:  # noqa E501
+        if gyr_sample is None:
+            if out is None:
+                return q
+            out[:] = q
+            return out
+        if out is None:
+            out = np.empty(4)
+        return _update_imu(q, gyr_sample, acc_sample, self.gain, self.Dt, out)
+
+    def updateMARG(self, q: np.ndarray, gyr_sample: np.ndarray, acc_sample: np.ndarray, mag_sample: np.ndarray, out: np.ndarray = None) -> np.ndarray:  # noqa E501
         """
         Quaternion Estimation with a MARG architecture.
 
@@ -663,6 +1067,10 @@ class Madgwick:
             Sample of tri-axial Accelerometer in m/s^2
         mag_sample : numpy.ndarray
             Sample of tri-axial Magnetometer in nT
+        out : numpy.ndarray, default: None
+            Array of 4 elements where the estimated quaternion is written,
+            e.g. the next row of a preallocated array ``Q``. A new array is
+            allocated if not given.
 
         Returns
         -------
@@ -680,7 +1088,14 @@ class Madgwick:
         >>> madgwick = Madgwick()
         >>> Q = np.tile([1., 0., 0., 0.], (len(gyro_data), 1)) # Allocate for quaternions
         >>> for t in range(1, num_samples):
-        ...   Q[t] = madgwick.updateMARG(Q[t-1], gyr=gyro_data[t], acc=acc_data[t], mag=mag_data[t])
+        ...   Q[t] = madgwick.updateMARG(Q[t-1], gyr_sample=gyro_data[t], acc_sample=acc_data[t], mag_sample=mag_data[t])
+        ...
+
+        The estimation can also be written in place, without allocating a new
+        array at each step:
+
+        >>> for t in range(1, num_samples):
+        ...   madgwick.updateMARG(Q[t-1], gyr_sample=gyro_data[t], acc_sample=acc_data[t], mag_sample=mag_data[t], out=Q[t])
         ...
 
         Or giving the data directly in the class constructor will estimate all
@@ -694,43 +1109,17 @@ class Madgwick:
         stored as quaternions.
 
         """  # noqa
-        if gyr_sample is None or not np.linalg.norm(gyr_sample) > 0:
-            return q
-        if mag_sample is None or not np.linalg.norm(mag_sample) > 0:
-            return self.updateIMU(q, gyr_sample, acc_sample)
-        qDot = 0.5 * q_prod(q, np.append(0., gyr_sample))           # (eq. 12)
-        a_norm = np.linalg.norm(acc_sample)
-        if a_norm > 0:
-            a = acc_sample / a_norm
-            m = mag_sample / np.linalg.norm(mag_sample)
-            # Rotate normalized magnetometer measurements
-            h = q_prod(q, q_prod(np.append(0., m), q_conj(q)))      # (eq. 45)
-            bx = np.sqrt(h[1]**2 + h[2]**2)                         # (eq. 46)
-            bz = h[3]
-            qw, qx, qy, qz = q / np.linalg.norm(q)
-            # Gradient objective function (eq. 31) and Jacobian (eq. 32)
-            f = np.array([2.0*(qx*qz - qw*qy)   - a[0],
-                          2.0*(qw*qx + qy*qz)   - a[1],
-                          2.0*(0.5-qx**2-qy**2) - a[2],
-                          2.0*bx*(0.5 - qy**2 - qz**2) + 2.0*bz*(qx*qz - qw*qy)       - m[0],
-                          2.0*bx*(qx*qy - qw*qz)       + 2.0*bz*(qw*qx + qy*qz)       - m[1],
-                          2.0*bx*(qw*qy + qx*qz)       + 2.0*bz*(0.5 - qx**2 - qy**2) - m[2]])  # (eq. 31)
-            J = np.array([[-2.0*qy,               2.0*qz,              -2.0*qw,               2.0*qx             ],
-                          [ 2.0*qx,               2.0*qw,               2.0*qz,               2.0*qy             ],
-                          [ 0.0,                 -4.0*qx,              -4.0*qy,               0.0                ],
-                          [-2.0*bz*qy,            2.0*bz*qz,           -4.0*bx*qy-2.0*bz*qw, -4.0*bx*qz+2.0*bz*qx],
-                          [-2.0*bx*qz+2.0*bz*qx,  2.0*bx*qy+2.0*bz*qw,  2.0*bx*qx+2.0*bz*qz, -2.0*bx*qw+2.0*bz*qy],
-                          [ 2.0*bx*qy,            2.0*bx*qz-4.0*bz*qx,  2.0*bx*qw-4.0*bz*qy,  2.0*bx*qx          ]]) # (eq. 32)
-            gradient = J.T @ f                                      # (eq. 34)
-            gradient /= np.linalg.norm(gradient)
-            qDot -= self.gain * gradient                            # (eq. 33)
-        q += qDot * self.Dt                                         # (eq. 13)
-        q /= np.linalg.norm(q)
-        return q
+        if gyr_sample is None:
+            if out is None:
+                return q
+            out[:] = q
+            return out
+        if out is None:
+            out = np.empty(4)
+        if mag_sample is None:
+            return _update_imu(q, gyr_sample, acc_sample, self.gain, self.Dt, out)
+        return _update_marg(q, gyr_sample, acc_sample, mag_sample, self.gain, self.Dt, out)  # noqa E501
 
     def gravity_estimate(self):
         "Return the gravity estimate from the computed quaternions"
-        attitude = np.zeros_like(self.acc)
-        for i, q in enumerate(self.Q):
-            attitude[i] = q_rot_g(q)
-        return attitude
+        return _rot_g_batch(self.Q, np.empty((len(self.Q), 3), dtype=self.Q.dtype))  # noqa E501
@@ -149,7 +149,7 @@ References
 """
 
 import numpy as np
-from ..common.mathfuncs import cosd, sind
+from ..common.mathfuncs import sincosd
 
 class OLEQ:
     """
@@ -209,7 +209,7 @@ class OLEQ:
             wmm = WMM(latitude=MUNICH_LATITUDE, longitude=MUNICH_LONGITUDE, height=MUNICH_HEIGHT)
             self.m_ref = np.array([wmm.X, wmm.Y, wmm.Z]) if frame.upper() == 'NED' else np.array([wmm.Y, wmm.X, -wmm.Z])
         elif isinstance(mref, (int, float)):
-            cd, sd = cosd(mref), sind(mref)
+            sd, cd = sincosd(mref)
             self.m_ref = np.array([cd, 0.0, sd]) if frame.upper() == 'NED' else np.array([0.0, cd, -sd])
         else:
             self.m_ref = np.copy(mref)
@@ -246,7 +246,11 @@ class QUEST:
         self.w = kw.get('weights', np.ones(2))
         # Reference measurements
         mdip = kw.get('magnetic_dip')                           # Magnetic dip, in degrees
-        self.m_q = np.array([MAG['X'], MAG['Y'], MAG['Z']]) if mdip is None else np.array([cosd(mdip), 0., sind(mdip)])
+        if mdip is None:
+            self.m_q = np.array([MAG['X'], MAG['Y'], MAG['Z']])
+        else:
+            sd, cd = sincosd(mdip)
+            self.m_q = np.array([cd, 0., sd])
         g = kw.get('gravity', GRAVITY)                          # Earth's normal gravity in m/s^2
         self.g_q = np.array([0.0, 0.0, g])                      # Normal Gravity vector
         if self.acc is not None and self.mag is not None:
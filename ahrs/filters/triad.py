@@ -348,7 +348,8 @@ class TRIAD:
         if isinstance(value, float):
             if abs(value)>90:
                 raise ValueError(f"Dip Angle must be within range [-90, 90]. Got {value}")
-            ref = np.array([cosd(value), 0.0, sind(value)]) if frame.upper()=='NED' else np.array([0.0, cosd(value), -sind(value)])
+            sd, cd = sincosd(value)
+            ref = np.array([cd, 0.0, sd]) if frame.upper()=='NED' else np.array([0.0, cd, -sd])
         if isinstance(value, (np.ndarray, list)):
             ref = np.copy(value)
         return ref/np.linalg.norm(ref)
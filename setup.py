@@ -17,8 +17,10 @@ All AHRS wheels distributed on PyPI are MIT licensed.
 
 """
 
+import os
 import sys
 from setuptools import setup, find_packages
+from setuptools.command.build_ext import build_ext
 from tools.versioning import get_version
 
 if sys.version_info < (3, 6):
@@ -26,6 +28,43 @@ if sys.version_info < (3, 6):
 
 __version__ = get_version()
 
+# Optional C implementation of the Madgwick sweeps (requires Cython). The
+# extension is built for the generic target of the compiler, so that wheels
+# run on any CPU of their platform. Set AHRS_NATIVE_ARCH=1 to tune it to the
+# building machine instead, only for local installations.
+compile_args = ['-O3', '-ffast-math']
+if os.environ.get('AHRS_NATIVE_ARCH', '0') not in ('', '0'):
+    compile_args.append('-march=native')
+try:
+    from Cython.Build import cythonize
+    from setuptools import Extension
+    ext_modules = cythonize([
+        Extension('ahrs.filters._madgwick_core',
+                  ['ahrs/filters/_madgwick_core.pyx'],
+                  extra_compile_args=compile_args)
+    ])
+except ImportError:
+    ext_modules = []
+
+
+class optional_build_ext(build_ext):
+    """Build the C extensions if possible, and skip them otherwise.
+
+    The package falls back to its Numba kernels without them, so a missing
+    or failing compiler must not abort the installation.
+    """
+    def run(self):
+        try:
+            super().run()
+        except Exception as e:
+            self.warn(f"C extensions not built, using Numba kernels: {e}")
+
+    def build_extension(self, ext):
+        try:
+            super().build_extension(ext)
+        except Exception as e:
+            self.warn(f"{ext.name} not built, using Numba kernels: {e}")
+
 REPOSITORY_URL = 'https://github.com/Mayitzin/ahrs/'
 
 with open("README.md", "r") as fh:
@@ -45,7 +84,7 @@ metadata = dict(
         "Source Code": REPOSITORY_URL,
         "Bug Tracker": REPOSITORY_URL+"issues"
     },
-    install_requires=['numpy'],
+    install_requires=['numpy', 'numba'],
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
@@ -63,7 +102,9 @@ metadata = dict(
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
     include_package_data=True,
-    packages=find_packages()
+    packages=find_packages(),
+    ext_modules=ext_modules,
+    cmdclass={'build_ext': optional_build_ext}
 )
 
 setup(**metadata)
@@ -19,7 +19,9 @@ References
 """
 
 import numpy as np
+import pytest
 import ahrs
+from ahrs.common.orientation import q_prod, q_conj, q_rot_g
 
 RAD2DEG = ahrs.common.RAD2DEG
 DEG2RAD = ahrs.common.DEG2RAD
@@ -68,3 +70,276 @@ class Test_Filter:
             # self.Q[t] = madgwick.updateIMU(DEG2RAD*self.data.gyr[t], self.data.acc[t], self.Q[t-1])
             self.Q[t] = madgwick.updateMARG(DEG2RAD*self.data.gyr[t], self.data.acc[t], self.data.mag[t], self.Q[t-1])
         return self.check_integrity(self.Q)
+
+
+# Madgwick filter
+
+def _imu_data(num_samples=500, seed=0):
+    rng = np.random.default_rng(seed)
+    gyr = rng.normal(0.0, 0.3, (num_samples, 3))
+    acc = rng.normal(0.0, 1.0, (num_samples, 3)) + [0.0, 0.0, 9.8]
+    mag = rng.normal(0.0, 5.0, (num_samples, 3)) + [20.0, 0.0, -40.0]
+    return gyr, acc, mag
+
+
+def _madgwick_per_sample(q0, gyr, acc, mag=None, gain=0.041):
+    """Reference estimation sample by sample with the update methods"""
+    madgwick = ahrs.filters.Madgwick(gain=gain)
+    Q = np.zeros((len(gyr), 4))
+    Q[0] = q0
+    for t in range(1, len(gyr)):
+        if mag is None:
+            Q[t] = madgwick.updateIMU(Q[t-1].copy(), gyr[t], acc[t])
+        else:
+            Q[t] = madgwick.updateMARG(Q[t-1].copy(), gyr[t], acc[t], mag[t])
+    return Q
+
+
+def _madgwick_imu_numpy(q, gyr, acc, gain, Dt):
+    """IMU update written with the plain equations of the original article"""
+    if not np.linalg.norm(gyr) > 0:
+        return q
+    qDot = 0.5 * q_prod(q, np.append(0.0, gyr))                      # (eq. 12)
+    a_norm = np.linalg.norm(acc)
+    if a_norm > 0:
+        a = acc / a_norm
+        qw, qx, qy, qz = q
+        f = np.array([2.0*(qx*qz - qw*qy) - a[0],
+                      2.0*(qw*qx + qy*qz) - a[1],
+                      2.0*(0.5 - qx**2 - qy**2) - a[2]])            # (eq. 25)
+        J = np.array([[-2.0*qy, 2.0*qz, -2.0*qw, 2.0*qx],
+                      [2.0*qx, 2.0*qw, 2.0*qz, 2.0*qy],
+                      [0.0, -4.0*qx, -4.0*qy, 0.0]])                # (eq. 26)
+        gradient = J.T @ f                                          # (eq. 34)
+        qDot = qDot - gain * gradient / np.linalg.norm(gradient)    # (eq. 33)
+    q = q + qDot * Dt                                               # (eq. 13)
+    return q / np.linalg.norm(q)
+
+
+def _madgwick_marg_numpy(q, gyr, acc, mag, gain, Dt):
+    """MARG update written with the plain equations of the original article"""
+    if not np.linalg.norm(gyr) > 0:
+        return q
+    if not np.linalg.norm(mag) > 0:
+        return _madgwick_imu_numpy(q, gyr, acc, gain, Dt)
+    qDot = 0.5 * q_prod(q, np.append(0.0, gyr))                      # (eq. 12)
+    a_norm = np.linalg.norm(acc)
+    if a_norm > 0:
+        a = acc / a_norm
+        m = mag / np.linalg.norm(mag)
+        h = q_prod(q, q_prod(np.append(0.0, m), q_conj(q)))         # (eq. 45)
+        bx, bz = np.linalg.norm(h[1:3]), h[3]                       # (eq. 46)
+        qw, qx, qy, qz = q
+        f = np.array([2.0*(qx*qz - qw*qy) - a[0],
+                      2.0*(qw*qx + qy*qz) - a[1],
+                      2.0*(0.5 - qx**2 - qy**2) - a[2],
+                      2.0*bx*(0.5 - qy**2 - qz**2) + 2.0*bz*(qx*qz - qw*qy) - m[0],
+                      2.0*bx*(qx*qy - qw*qz) + 2.0*bz*(qw*qx + qy*qz) - m[1],
+                      2.0*bx*(qw*qy + qx*qz) + 2.0*bz*(0.5 - qx**2 - qy**2) - m[2]])  # (eq. 31)
+        J = np.array([[-2.0*qy, 2.0*qz, -2.0*qw, 2.0*qx],
+                      [2.0*qx, 2.0*qw, 2.0*qz, 2.0*qy],
+                      [0.0, -4.0*qx, -4.0*qy, 0.0],
+                      [-2.0*bz*qy, 2.0*bz*qz, -4.0*bx*qy - 2.0*bz*qw, -4.0*bx*qz + 2.0*bz*qx],
+                      [-2.0*bx*qz + 2.0*bz*qx, 2.0*bx*qy + 2.0*bz*qw, 2.0*bx*qx + 2.0*bz*qz, -2.0*bx*qw + 2.0*bz*qy],
+                      [2.0*bx*qy, 2.0*bx*qz - 4.0*bz*qx, 2.0*bx*qw - 4.0*bz*qy, 2.0*bx*qx]])  # (eq. 32)
+        gradient = J.T @ f                                          # (eq. 34)
+        qDot = qDot - gain * gradient / np.linalg.norm(gradient)    # (eq. 33)
+    q = q + qDot * Dt                                               # (eq. 13)
+    return q / np.linalg.norm(q)
+
+
+def test_madgwick_numpy_reference():
+    gyr, acc, mag = _invalid_samples(*_imu_data())
+    for m in (None, mag):
+        for kw in ({}, {'specialize': True}):
+            Q = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m, gain=0.041, frequency=50.0, **kw).Q  # noqa E501
+            ref = np.zeros_like(Q)
+            ref[0] = Q[0]
+            for t in range(1, len(Q)):
+                if m is None:
+                    ref[t] = _madgwick_imu_numpy(ref[t-1], gyr[t], acc[t], 0.041, 0.02)
+                else:
+                    ref[t] = _madgwick_marg_numpy(ref[t-1], gyr[t], acc[t], m[t], 0.041, 0.02)
+            assert np.allclose(Q, ref, rtol=0.0, atol=1e-12)
+
+
+def test_madgwick_nan_acc():
+    gyr, acc, mag = _imu_data()
+    acc[10] = [np.nan, 0.0, 9.8]
+    acc[20:25] = np.nan
+    for m in (None, mag):
+        Q = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m, gain=0.041).Q
+        assert np.isfinite(Q).all()
+        assert np.allclose(Q, _madgwick_per_sample(Q[0], gyr, acc, m), atol=1e-12)
+
+
+def test_madgwick_memory_layout():
+    gyr, acc, mag = _imu_data()
+    for m in (None, mag):
+        Q = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m).Q
+        # Fortran-ordered arrays, and rows of transposed (3, N) buffers
+        for layout in (np.asfortranarray, lambda x: np.ascontiguousarray(x.T).T):
+            Q_f = ahrs.filters.Madgwick(gyr=layout(gyr), acc=layout(acc),
+                                       mag=None if m is None else layout(m)).Q
+            assert np.allclose(Q_f, Q, atol=1e-15)
+
+
+def test_madgwick_nan_sample_updates():
+    gyr, acc, mag = _imu_data(2)
+    madgwick = ahrs.filters.Madgwick(gain=0.041)
+    q = np.array([0.9, 0.1, -0.2, 0.3])
+    q /= np.linalg.norm(q)
+    nan_sample = np.array([np.nan, 0.0, 0.0])
+    # Invalid gyroscope samples leave the orientation unchanged
+    for gyr_sample in (nan_sample, np.zeros(3)):
+        assert np.allclose(madgwick.updateIMU(q.copy(), gyr_sample, acc[1]), q)
+        assert np.allclose(madgwick.updateMARG(q.copy(), gyr_sample, acc[1], mag[1]), q)
+    # Invalid magnetometer samples fall back to the IMU update
+    q_imu = madgwick.updateIMU(q.copy(), gyr[1], acc[1])
+    for mag_sample in (nan_sample, np.zeros(3)):
+        assert np.allclose(madgwick.updateMARG(q.copy(), gyr[1], acc[1], mag_sample), q_imu)
+
+
+def test_madgwick_nan_gyr():
+    gyr, acc, mag = _imu_data()
+    gyr[10] = [np.nan, 0.0, 0.0]
+    gyr[30:33] = 0.0
+    gyr_copy = gyr.copy()
+    for m in (None, mag):
+        Q = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m, gain=0.041).Q
+        assert np.isfinite(Q).all()
+        assert np.allclose(Q, _madgwick_per_sample(Q[0], gyr, acc, m), atol=1e-12)
+        assert np.allclose(Q[10], Q[9]) and np.allclose(Q[32], Q[29])
+    # The user's samples are not modified
+    assert np.array_equal(gyr, gyr_copy, equal_nan=True)
+
+
+def _invalid_samples(gyr, acc, mag):
+    """Null, NaN and non-contiguous copies of the samples"""
+    gyr, acc, mag = gyr.copy(), acc.copy(), mag.copy()
+    gyr[7], gyr[40:45] = np.nan, 0.0
+    acc[5], acc[100:110] = 0.0, np.nan
+    mag[9], mag[200:205] = np.nan, 0.0
+    return [np.asfortranarray(x) for x in (gyr, acc, mag)]
+
+
+def test_madgwick_sweeps():
+    gyr, acc, mag = _invalid_samples(*_imu_data())
+    for m in (None, mag):
+        ref = _madgwick_per_sample(ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m).Q[0], gyr, acc, m)
+        for kw in ({}, {'specialize': True}):
+            Q = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m, gain=0.041, **kw).Q
+            assert Q.dtype == np.float64
+            assert np.allclose(Q, ref, rtol=0.0, atol=1e-13)
+        Q = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m, gain=0.041, dtype=np.float32).Q
+        assert Q.dtype == np.float32
+        assert np.allclose(Q, ref, rtol=0.0, atol=1e-5)
+
+
+def test_madgwick_compiled_extensions():
+    from ahrs.filters import madgwick
+    gyr, acc, mag = _invalid_samples(*_imu_data())
+    gyr, acc, acc_w = ahrs.filters.Madgwick._weights(np.ascontiguousarray(gyr), acc)
+    mag = ahrs.filters.Madgwick._normalize_rows(mag)[0]
+    Q_imu, Q_marg = np.zeros((2, len(gyr), 4))
+    Q_imu[0] = Q_marg[0] = [1.0, 0.0, 0.0, 0.0]
+    madgwick._compute_all_imu(Q_imu.ravel(), gyr, acc, acc_w, 0.041, 0.01)
+    madgwick._compute_all_marg(Q_marg.ravel(), gyr, acc, acc_w, mag, 0.041, 0.01)
+    extensions = {'c': (madgwick._run_imu_c, madgwick._run_marg_c, False),
+                  'aot': (madgwick._run_imu_aot, madgwick._run_marg_aot, True)}
+    built = [k for k, v in extensions.items() if v[0] is not None]
+    if not built:
+        pytest.skip("compiled extensions of the Madgwick sweeps not built")
+    if madgwick._run_imu_c is not None:
+        from ahrs.filters import _madgwick_core
+        assert _madgwick_core.TINY == madgwick._TINY
+    for name in built:
+        run_imu, run_marg, flat = extensions[name]
+        Q = np.zeros((len(gyr), 4))
+        Q[0] = Q_imu[0]
+        run_imu(Q.ravel() if flat else Q, gyr, acc, acc_w, 0.041, 0.01)
+        assert np.allclose(Q, Q_imu, rtol=0.0, atol=1e-13)
+        run_marg(Q.ravel() if flat else Q, gyr, acc, acc_w, mag, 0.041, 0.01)
+        assert np.allclose(Q, Q_marg, rtol=0.0, atol=1e-13)
+
+
+def test_madgwick_update_out():
+    gyr, acc, mag = _imu_data()
+    for m in (None, mag):
+        gain = 0.033 if m is None else 0.041
+        ref = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=m, gain=gain, frequency=50.0).Q
+        madgwick = ahrs.filters.Madgwick(gain=gain, frequency=50.0)
+        Q = np.zeros_like(ref)
+        Q[0] = ref[0]
+        for t in range(1, len(Q)):
+            if m is None:
+                madgwick.updateIMU(Q[t-1], gyr[t], acc[t], out=Q[t])
+            else:
+                madgwick.updateMARG(Q[t-1], gyr[t], acc[t], m[t], out=Q[t])
+        assert np.allclose(Q, ref, rtol=0.0, atol=1e-13)
+        # In place update of the a-priori quaternion
+        q = Q[10].copy()
+        if m is None:
+            expected = madgwick.updateIMU(q, gyr[11], acc[11])
+            assert madgwick.updateIMU(q, gyr[11], acc[11], out=q) is q
+        else:
+            expected = madgwick.updateMARG(q, gyr[11], acc[11], m[11])
+            assert madgwick.updateMARG(q, gyr[11], acc[11], m[11], out=q) is q
+        assert np.allclose(q, expected, rtol=0.0, atol=1e-15)
+        # Early returns of null, NaN and missing gyroscope samples
+        for g in (np.zeros(3), np.array([np.nan, 0.0, 0.0]), None):
+            out = np.full(4, np.nan)
+            if m is None:
+                assert madgwick.updateIMU(Q[10], g, acc[11], out=out) is out
+            else:
+                assert madgwick.updateMARG(Q[10], g, acc[11], m[11], out=out) is out
+            assert np.array_equal(out, Q[10])
+
+
+def test_madgwick_dtype():
+    gyr, acc, mag = _imu_data()
+    for dtype in (np.float16, np.int64, complex):
+        with pytest.raises(ValueError):
+            ahrs.filters.Madgwick(gyr=gyr, acc=acc, dtype=dtype)
+    assert ahrs.filters.Madgwick(gyr=gyr, acc=acc, dtype='float32').Q.dtype == np.float32
+
+
+def test_madgwick_gravity_estimate():
+    gyr, acc, mag = _imu_data()
+    for dtype in (np.float64, np.float32):
+        madgwick = ahrs.filters.Madgwick(gyr=gyr, acc=acc, mag=mag, dtype=dtype)
+        g = madgwick.gravity_estimate()
+        assert g.shape == (len(gyr), 3)
+        assert g.dtype == dtype
+        ref = np.array([q_rot_g(q.astype(np.float64)) for q in madgwick.Q])
+        assert np.allclose(g, ref, rtol=0.0, atol=1e-13 if dtype == np.float64 else 1e-6)
+
+
+def test_madgwick_run_batch():
+    recordings = [_imu_data(300, seed) for seed in range(4)]
+    gyrs, accs, mags = [np.stack(x) for x in zip(*recordings)]
+    gyrs[1, 10], accs[2, 20], mags[3, 30] = np.nan, 0.0, np.nan
+    for m in (None, mags):
+        Q = ahrs.filters.Madgwick.run_batch(gyrs, accs, m, frequency=50.0)
+        assert Q.shape == (4, 300, 4)
+        for i in range(len(Q)):
+            filt = ahrs.filters.Madgwick(gyr=gyrs[i], acc=accs[i], mag=None if m is None else m[i], frequency=50.0)  # noqa E501
+            assert np.allclose(Q[i], filt.Q, rtol=0.0, atol=1e-13)
+    # Given initial orientations and gain
+    q0s = np.tile([0.0, 1.0, 0.0, 0.0], (4, 1))
+    Q = ahrs.filters.Madgwick.run_batch(gyrs, accs, mags, q0s=q0s, gain=0.1, Dt=0.02)
+    for i in range(len(Q)):
+        filt = ahrs.filters.Madgwick(gyr=gyrs[i], acc=accs[i], mag=mags[i], q0=q0s[i], gain=0.1, Dt=0.02)  # noqa E501
+        assert np.allclose(Q[i], filt.Q, rtol=0.0, atol=1e-13)
+
+
+def test_madgwick_run_batch_shapes():
+    gyrs, accs, mags = [np.stack(x) for x in zip(_imu_data(50, 0), _imu_data(50, 1))]
+    invalid = [dict(gyrs=gyrs[0], accs=accs[0]),
+               dict(gyrs=gyrs[..., :2], accs=accs[..., :2]),
+               dict(gyrs=gyrs, accs=accs[:, :40]),
+               dict(gyrs=gyrs, accs=accs, mags=mags[:1]),
+               dict(gyrs=gyrs, accs=accs, q0s=np.ones((3, 4)))]
+    for kw in invalid:
+        with pytest.raises(ValueError):
+            ahrs.filters.Madgwick.run_batch(**kw)
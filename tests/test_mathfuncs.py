@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Test Mathematical Functions
+
+"""
+
+import numpy as np
+from numba import njit
+from ahrs.common.mathfuncs import cosd, sind, sincosd, skew, skew_batch, skew_mul, skew_sq
+
+
+def test_sincosd():
+    """
+    Test fused sine and cosine against sind and cosd
+    """
+    for x in (30.0, -120, [0.0, 45.0, 90.0], np.random.uniform(-360, 360, (4, 5, 3))):
+        s, c = sincosd(x)
+        assert np.allclose(s, sind(x))
+        assert np.allclose(c, cosd(x))
+        assert np.shape(s) == np.shape(x)
+
+
+def test_sincosd_compiled():
+    """
+    Test calls of sincosd, sind and cosd from compiled code
+    """
+    @njit
+    def scalar(x):
+        s, c = sincosd(x)
+        return s, c, sind(x), cosd(x)
+
+    @njit
+    def array(x):
+        s, c = sincosd(x)
+        return s, c, sind(x), cosd(x)
+
+    s, c, s2, c2 = scalar(60.0)
+    assert np.allclose([s, c], [s2, c2])
+    assert np.allclose([s, c], [np.sqrt(3)/2, 0.5])
+    x = np.random.uniform(-360, 360, (3, 7))
+    s, c, s2, c2 = array(x)
+    assert np.allclose(s, s2) and np.allclose(c, c2)
+    assert np.allclose(s, np.sin(np.radians(x))) and np.allclose(c, np.cos(np.radians(x)))
+
+
+def test_skew():
+    """
+    Test the skew-symmetric matrix and its output buffer
+    """
+    x = np.random.random(3)
+    X = skew(x)
+    assert np.allclose(X, -X.T)
+    assert np.allclose(X @ x, 0.0)
+    assert np.allclose(skew(list(x)), X)
+    assert np.allclose(skew(x.reshape((3, 1))), X)
+    buffer = np.full((3, 3), np.nan)
+    assert skew(x, out=buffer) is buffer
+    assert np.allclose(buffer, X)
+
+
+def test_skew_batch():
+    """
+    Test the batched skew-symmetric matrices against skew
+    """
+    X = np.random.random((10, 3))
+    S = skew_batch(X)
+    assert S.shape == (10, 3, 3)
+    for i in range(len(X)):
+        assert np.allclose(S[i], skew(X[i]))
+    buffer = np.empty((10, 3, 3))
+    assert skew_batch(X, buffer) is buffer
+    assert np.allclose(buffer, S)
+
+
+def test_skew_mul():
+    """
+    Test the product with a skew-symmetric matrix, also in place
+    """
+    w = np.random.random(3)
+    M = np.random.random((3, 5))
+    assert np.allclose(skew_mul(w, M), skew(w) @ M)
+    P = skew(w) @ M
+    assert skew_mul(w, M, M) is M
+    assert np.allclose(M, P)
+
+
+def test_skew_sq():
+    """
+    Test the square of a skew-symmetric matrix
+    """
+    w = np.random.random(3)
+    assert np.allclose(skew_sq(w), skew(w) @ skew(w))
+    buffer = np.empty((3, 3))
+    assert skew_sq(w, buffer) is buffer
+    assert np.allclose(buffer, skew(w) @ skew(w))
+
+
+def test_skew_compiled():
+    """
+    Test calls of the skew-symmetric routines from compiled code
+    """
+    @njit
+    def products(w, M):
+        return skew(w) @ M, skew_mul(w, M), skew(w) @ skew(w), skew_sq(w)
+
+    w = np.random.random(3)
+    M = np.random.random((3, 3))
+    P, P2, Q, Q2 = products(w, M)
+    assert np.allclose(P, P2)
+    assert np.allclose(Q, Q2)